@@ -1,7 +1,8 @@
 import ast
 import inspect
 import logging
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+from functools import cache
 
 from core.exercises import assert_equal
 from core.question_wizard import question_wizard_check
@@ -12,18 +13,26 @@ from core.utils import highlighted_markdown, catch_internal_errors
 log = logging.getLogger(__name__)
 
 
+@cache
+def get_stack_data():
+    # Delay importing stack_data in general, it's only needed by the question wizard.
+    import stack_data
+    return stack_data
+
+
 class FullRunner(EnhancedRunner):
     question_wizard = False
     input_nodes = {}
 
     def input(self, prompt=""):
         result = super().input(prompt)
+        if not self.question_wizard:
+            return result
+
         try:
-            assert self.question_wizard
             frame = inspect.currentframe().f_back
             assert frame.f_code.co_filename == self.filename
-            import stack_data
-            ex = stack_data.Source.executing(frame)
+            ex = get_stack_data().Source.executing(frame)
             node = ex.node
             assert isinstance(node, ast.Call)
             self.input_nodes[node].append((result, ex))
@@ -34,17 +43,20 @@ class FullRunner(EnhancedRunner):
     def reset(self):
         super().reset()
         if self.question_wizard:
-            # Delay importing stack_data in general.
             # Clear the source cache before running in the question wizard
             # for the input() magic to work properly.
-            import stack_data
-            stack_data.Source._class_local("__source_cache", {}).pop(self.filename, None)
+            get_stack_data().Source._class_local("__source_cache", {}).pop(self.filename, None)
 
         self.console.locals.update(assert_equal=assert_equal)
 
 
 default_runner = FullRunner(filename="/my_program.py")
 
+# Results of checking steps, so that running the same code again skips the check.
+# The code itself is always run so that the output is still shown.
+step_results_cache = OrderedDict()
+STEP_RESULTS_CACHE_SIZE = 64
+
 
 @catch_internal_errors
 def check_entry(entry, callback, runner=default_runner):
@@ -61,9 +73,13 @@ def check_entry(entry, callback, runner=default_runner):
             return result
 
         result["output"] = ""
+        requested_input = False
 
         def wrapped_callback(event_type, data):
-            if event_type == "output":
+            nonlocal requested_input
+            if event_type == "input":
+                requested_input = True
+            elif event_type == "output":
                 parts = []
                 for part in data["parts"]:
                     typ = part["type"]
@@ -95,38 +111,63 @@ def check_entry(entry, callback, runner=default_runner):
             ) = question_wizard_check(entry, result["output"], runner)
             return result
 
-        page = pages[entry["page_slug"]]
-        step_cls = page.get_step(entry["step_name"])
-
-        step_result = False
-        if entry["step_name"] != "final_text":
-            step_instance = step_cls(
-                entry["input"], result["output"], entry["source"], runner.console
+        # Shell commands can depend on state left by previous commands,
+        # and input() values aren't part of the output, so those checks aren't cached
+        if entry["source"] == "shell" or requested_input:
+            cache_key = None
+        else:
+            cache_key = (
+                entry["page_slug"],
+                entry["step_name"],
+                entry["source"],
+                entry["input"],
+                result["output"],
             )
-            try:
-                step_result = step_instance.check_with_messages()
-            except SyntaxError:
-                pass
-
-        step_result = normalise_step_result(step_result)
-        result.update(
-            passed=step_result["passed"],
-            messages=[highlighted_markdown(message) for message in step_result["messages"]],
-        )
+
+        if cache_key in step_results_cache:
+            step_results_cache.move_to_end(cache_key)
+            passed, messages = step_results_cache[cache_key]
+        else:
+            passed, messages = check_step(entry, result["output"], runner)
+            if cache_key is not None:
+                step_results_cache[cache_key] = passed, messages
+                if len(step_results_cache) > STEP_RESULTS_CACHE_SIZE:
+                    step_results_cache.popitem(last=False)
+
+        result.update(passed=passed, messages=list(messages))
     except KeyboardInterrupt:
         result["interrupted"] = True
 
     return result
 
 
+def check_step(entry, output, runner):
+    page = pages[entry["page_slug"]]
+    step_cls = page.get_step(entry["step_name"])
+
+    step_result = False
+    if entry["step_name"] != "final_text":
+        step_instance = step_cls(
+            entry["input"], output, entry["source"], runner.console
+        )
+        try:
+            step_result = step_instance.check_with_messages()
+        except SyntaxError:
+            pass
+
+    step_result = normalise_step_result(step_result)
+    messages = tuple(highlighted_markdown(message) for message in step_result["messages"])
+    return step_result["passed"], messages
+
+
 def normalise_step_result(step_result):
-    if hasattr(step_result, "text"):
-        step_result = dict(message=step_result.text)
+    if isinstance(step_result, bool):
+        return dict(passed=step_result, messages=[])
 
-    if not isinstance(step_result, dict):
-        assert isinstance(step_result, bool)
-        step_result = dict(passed=step_result, messages=[])
+    if hasattr(step_result, "text"):
+        return dict(passed=False, messages=[step_result.text])
 
+    assert isinstance(step_result, dict)
     step_result.setdefault("passed", False)
 
     messages = step_result.setdefault("messages", [])
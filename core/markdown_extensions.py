@@ -62,9 +62,5 @@ class HighlightPythonTreeProcessor(Treeprocessor):
 
 
 class HighlightPythonExtension(Extension):
-    codes = None
-
     def extendMarkdown(self, md):
-        processor = HighlightPythonTreeProcessor()
-        processor.codes = self.codes
-        md.treeprocessors.register(processor, "highlight_python", 0)
+        md.treeprocessors.register(HighlightPythonTreeProcessor(), "highlight_python", 0)
@@ -7,7 +7,7 @@ import re
 import traceback
 from abc import ABC, abstractmethod
 from copy import deepcopy
-from functools import cached_property, cache
+from functools import cached_property, cache, lru_cache
 from importlib import import_module
 from io import StringIO
 from pathlib import Path
@@ -19,7 +19,7 @@ from typing import Union, List, get_type_hints
 
 import pygments
 from astcheck import is_ast_like
-from littleutils import setattrs, only, select_attrs
+from littleutils import only, select_attrs
 
 from core import translation as t
 from core.exercises import (
@@ -46,8 +46,11 @@ from core.utils import (
     NoMethodWrapper,
     add_stdin_input_arg,
     qa_error,
+    whitespace_regex,
 )
 
+program_indented_regex = re.compile(r" *__program_indented__", re.MULTILINE)
+
 
 def clean_program(program, cls):
     if callable(program) and not cls.auto_translate_program:
@@ -116,6 +119,15 @@ def clean_solution_function(func, source):
     )
 
 
+def get_clean_translation(msgid, text):
+    # text has already been through clean_spaces, which doesn't need repeating
+    # if the translation is the same (e.g. in English)
+    result = t.get(msgid, text)
+    if result == text:
+        return text
+    return clean_spaces(result)
+
+
 def get_special_messages(cls):
     return [v for k, v in inspect.getmembers(cls.special_messages) if not k.startswith("__")]
 
@@ -153,8 +165,7 @@ def clean_step_class(cls):
 
     text = clean_spaces(text)
     assert text
-    text = t.get(cls.text_msgid, text)
-    text = clean_spaces(text)
+    text = get_clean_translation(cls.text_msgid, text)
     cls.raw_text = text
 
     assert "__program__indented__" not in text
@@ -162,7 +173,8 @@ def clean_step_class(cls):
     if "__program_" in text:
         text = text.replace("__program__", program)
         indented = indent(program, '    ').replace("\\", "\\\\")
-        text = re.sub(r" *__program_indented__", indented, text, flags=re.MULTILINE)
+        text = program_indented_regex.sub(indented, text)
+        text = clean_spaces(text)
     else:
         if cls.program_in_text:
             qa_error(
@@ -172,7 +184,6 @@ def clean_step_class(cls):
             )
 
     assert "__program_" not in text, (cls, text)
-    text = clean_spaces(text)
 
     for special_message in get_special_messages(cls):
         msgstr = clean_spaces(special_message.__doc__ or special_message.text)
@@ -183,8 +194,14 @@ def clean_step_class(cls):
         except SyntaxError:
             pass
 
+    # Equivalent to inspect.getmembers(cls) for plain class attributes,
+    # without calling getattr on every name.
+    members = {}
+    for klass in reversed(cls.__mro__):
+        members.update(vars(klass))
+
     messages = []
-    for name, inner_cls in inspect.getmembers(cls):
+    for name, inner_cls in sorted(members.items()):
         if not (isinstance(inner_cls, type) and issubclass(inner_cls, Step)):
             continue
         assert issubclass(inner_cls, MessageStep)
@@ -209,11 +226,18 @@ def clean_step_class(cls):
         if inner_cls.after_success and issubclass(inner_cls, ExerciseStep):
             cls.check_exercise(inner_cls.solution)
 
-    setattrs(cls,
-             text=text,
-             program=program,
-             messages=messages,
-             hints=hints)
+    cls.text = text
+    cls.program = program
+    cls.messages = messages
+    cls.hints = hints
+
+    cls.success_messages = tuple(m for m in messages if m.after_success)
+    cls.failure_messages = tuple(m for m in messages if not m.after_success)
+
+    # Parsed once here rather than on every submission in VerbatimStep.check.
+    # Set explicitly even when invalid so message steps don't inherit the parent's trees.
+    cls.program_tree = parse_or_none(program)
+    cls.lower_program_tree = parse_or_none(program.lower())
 
     if hints:
         cls.get_solution = get_solution(cls)
@@ -227,6 +251,13 @@ def clean_step_class(cls):
         getattr(t.Terms, f"expected_mode_{cls.expected_code_source}")
 
 
+def parse_or_none(source):
+    try:
+        return ast.parse(source)
+    except SyntaxError:
+        return None
+
+
 def get_predictions(cls):
     choices = getattr(cls, "predicted_output_choices", None)
     if not choices:
@@ -300,6 +331,7 @@ def get_solution(step):
 
 pages = {}
 page_slugs_list = []
+page_indices = {}
 
 
 class PageMeta(type):
@@ -311,6 +343,7 @@ class PageMeta(type):
         if cls.__name__ == "Page":
             return
         pages[cls.slug] = cls
+        page_indices[cls.slug] = len(page_slugs_list)
         page_slugs_list.append(cls.slug)
         cls.step_names = []
         for key, value in cls.__dict__.items():
@@ -318,8 +351,7 @@ class PageMeta(type):
                 cls.step_names.append(key)
 
         cls.final_text = clean_spaces(cls.final_text)
-        cls.final_text = t.get(t.step_text(cls.slug, "final_text"), cls.final_text)
-        cls.final_text = clean_spaces(cls.final_text)
+        cls.final_text = get_clean_translation(t.step_text(cls.slug, "final_text"), cls.final_text)
         cls.step_names.append("final_text")
 
     def get_step(cls, step_name):
@@ -362,7 +394,7 @@ class PageMeta(type):
 
     @property
     def index(self):
-        return page_slugs_list.index(self.slug)
+        return page_indices[self.slug]
 
     @property
     def next_page(self):
@@ -429,6 +461,8 @@ class Step(ABC):
     hints = ()
     is_step = True
     messages = ()
+    success_messages = ()
+    failure_messages = ()
     tests = {}
     expected_code_source = None
     disallowed: List[Disallowed] = []
@@ -441,6 +475,8 @@ class Step(ABC):
     translated_tests = False
     page = None
     is_function_exercise = False
+    program_tree = None
+    lower_program_tree = None
 
     class special_messages:
         pass
@@ -450,7 +486,6 @@ class Step(ABC):
         pass
 
     def __init__(self, *args):
-        self.args = args
         self.input, self.result, self.code_source, self.console = args
 
     def clean_check(self) -> Union[bool, dict]:
@@ -465,8 +500,9 @@ class Step(ABC):
 
     def check_with_messages(self):
         result = self.clean_check()
-        for message_cls in self.messages:
-            if (result is True) == message_cls.after_success and (message_cls.check_message(self) is True):
+        messages = self.success_messages if result is True else self.failure_messages
+        for message_cls in messages:
+            if message_cls.check_message(self) is True:
                 return message_cls
 
         if result is True:
@@ -506,13 +542,14 @@ class Step(ABC):
 
     @cached_property
     def tree(self):
-        return ast.parse(self.input)
+        # Not optimized, since that can fold constants (e.g. 2 * 3) away before checks see them
+        return compile(self.input, "<step>", "exec", ast.PyCF_ONLY_AST, dont_inherit=True)
 
     def input_matches(self, pattern, remove_spaces=True):
         inp = self.input.rstrip()
         if remove_spaces:
-            inp = re.sub(r'\s', '', inp)
-        return re.match(pattern + '$', inp)
+            inp = whitespace_regex.sub('', inp)
+        return full_input_regex(pattern).match(inp)
 
     @cached_property
     def function_tree(self):
@@ -523,6 +560,11 @@ class Step(ABC):
         return function_node(func, self.tree)
 
 
+@lru_cache(maxsize=512)
+def full_input_regex(pattern):
+    return re.compile(pattern + '$')
+
+
 def function_node(func, tree):
     function_name = t.get_code_bit(func.__name__)
     return only(
@@ -615,7 +657,7 @@ class ExerciseStep(Step):
 
     @classmethod
     def arg_names(cls):
-        return list(inspect.signature(cls.solution).parameters)
+        return list(solution_arg_names(cls.solution))
 
     @classmethod
     def test_values(cls):
@@ -657,10 +699,20 @@ class ExerciseStep(Step):
     def generate_inputs(cls):
         return {
             name: generate_for_type(typ)
-            for name, typ in get_type_hints(cls.solution).items()
+            for name, typ in solution_type_hints(cls.solution).items()
         }
 
 
+@cache
+def solution_arg_names(solution):
+    return tuple(inspect.signature(solution).parameters)
+
+
+@cache
+def solution_type_hints(solution):
+    return get_type_hints(solution)
+
+
 class VerbatimStep(Step):
     program_in_text = True
 
@@ -671,15 +723,19 @@ class VerbatimStep(Step):
         try:
             if result:= self.truncated_trees_match(
                 self.tree,
-                ast.parse(self.program),
+                self.program_tree or ast.parse(self.program),
             ):
                 return result
         except SyntaxError:
             pass
+        else:
+            if self.input == self.input.lower() and self.program == self.program.lower():
+                # The case insensitive comparison below would be identical to the one above
+                return False
 
         if self.truncated_trees_match(
             ast.parse(self.input.lower()),
-            ast.parse(self.program.lower()),
+            self.lower_program_tree or ast.parse(self.program.lower()),
         ):
             return dict(message=t.Terms.case_sensitive)
 
@@ -732,7 +788,7 @@ class MessageStep(Step, ABC):
 
     @classmethod
     def check_message(cls, step):
-        return cls(*step.args).clean_check()
+        return cls(step.input, step.result, step.code_source, step.console).clean_check()
 
 
 def search_ast(node, template, predicate=lambda n: True):
@@ -742,12 +798,18 @@ def search_ast(node, template, predicate=lambda n: True):
     or a partial AST that is passed to `is_ast_like`)
     and satisfy the optional predicate.
     """
+    if isinstance(template, (type, tuple)):
+        node_type, partial_ast = template, None
+    elif isinstance(template, ast.AST):
+        # is_ast_like fails on a type mismatch anyway, but more slowly (by raising internally)
+        node_type, partial_ast = type(template), template
+    else:
+        # e.g. an astcheck checker function, which can match any node
+        node_type, partial_ast = ast.AST, template
+
     return sum(
-        (
-            isinstance(child, template)
-            if isinstance(template, (type, tuple)) else
-            is_ast_like(child, template)
-        )
+        isinstance(child, node_type)
+        and (partial_ast is None or is_ast_like(child, partial_ast))
         and predicate(child)
         and child != node
         for child in ast.walk(node)
@@ -48,6 +48,9 @@ def set_language(language):
     for key, value in misc_terms():
         setattr(Terms, key, get(misc_term(key), value))
 
+    # Rendered markdown can contain translated terms, e.g. the copy button
+    core.utils.highlighted_markdown.cache_clear()
+
 
 def get(msgid, default):
     assert msgid
@@ -108,6 +111,10 @@ def get(msgid, default):
 
 
 def translate_code(code):
+    if current_language is None:
+        # Every code bit would be returned unchanged, so skip tokenizing the code
+        return code
+
     replacements = []
     for node, node_text in get_code_bits(code):
         start = code.find(node_text, node.first_token.startpos)
@@ -125,6 +132,8 @@ def translate_program(cls, program):
         result = translate_code(program)
     else:
         result = get(step_program(cls), program)
+    if result == program:
+        return program
     return clean_spaces(result)
 
 
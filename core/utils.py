@@ -44,16 +44,19 @@ internal_dir = os.path.dirname(os.path.dirname(
     (lambda: 0).__code__.co_filename
 ))
 
+whitespace_regex = re.compile(r"\s")
+bad_indentation_regex = re.compile(r"^( {1,3}| {5,})_", re.MULTILINE)
+
 
 def clean_spaces(string):
     if isinstance(string, list):
         string = "\n".join(string)
     string = dedent(string).strip()
-    spaces = set(re.findall(r"\s", string))
+    spaces = set(whitespace_regex.findall(string))
     assert spaces <= {" ", "\n"}, spaces
     # In translation, special codes like `__copyable__` often get the wrong indentation.
     # They must be preceded by 0 or 4 spaces.
-    if re.search(r"^( {1,3}| {5,})_", string, re.MULTILINE):
+    if bad_indentation_regex.search(string):
         qa_error("Incorrect indentation of code:\n" + string)
     return string
 
@@ -161,15 +164,23 @@ def format_exception_string():
     return ''.join(traceback.format_exception_only(*sys.exc_info()[:2]))
 
 
-def highlighted_markdown_and_codes(text):
-    from markdown import markdown
+@functools.cache
+def get_markdown_converter():
+    from markdown import Markdown
     from .markdown_extensions import HighlightPythonExtension
 
-    extension = HighlightPythonExtension()
-    extension.codes = []
-    return markdown(text, extensions=[extension, 'markdown.extensions.tables']), extension.codes
+    return Markdown(extensions=[HighlightPythonExtension(), 'markdown.extensions.tables'])
+
+
+def highlighted_markdown_and_codes(text):
+    # Reuse one converter instead of building a new one with its extensions for every text
+    md = get_markdown_converter()
+    md.reset()
+    codes = md.treeprocessors["highlight_python"].codes = []
+    return md.convert(text), codes
 
 
+@functools.lru_cache(maxsize=1024)
 def highlighted_markdown(text):
     result = highlighted_markdown_and_codes(text)[0]
     if "__copyable__" in result or "__no_auto_translate__" in result:
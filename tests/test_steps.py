@@ -6,9 +6,10 @@ from pathlib import Path
 
 from littleutils import only
 
+import core.checker
 import core.utils
 from core import translation as t
-from core.checker import check_entry, FullRunner
+from core.checker import check_entry, FullRunner, step_results_cache
 from core.text import step_test_entries, get_predictions, load_chapters
 from core.utils import highlighted_markdown, make_test_input_callback
 
@@ -100,3 +101,55 @@ def normalise_response(response, is_message, substep):
     else:
         assert response.pop("messages") == []
         response["message"] = ""
+
+
+def check_name_assign(program, source="editor", stdin_input=""):
+    t.set_language(os.environ.get("FUTURECODER_LANGUAGE", "en"))
+    list(load_chapters())
+    input_callback = make_test_input_callback(stdin_input)
+
+    def callback(event_type, data):
+        if event_type == "input":
+            return input_callback(data)
+
+    entry = dict(
+        input=program.format(your_name=t.get_code_bit("your_name")),
+        source=source,
+        page_slug="UsingVariables",
+        step_name="name_assign",
+    )
+    return check_entry(entry, callback, FullRunner(filename="/my_program.py"))
+
+
+def test_repeated_submission_uses_cache(monkeypatch):
+    step_results_cache.clear()
+    first = check_name_assign("{your_name} = 'Alex'")
+    assert first["passed"]
+    assert len(step_results_cache) == 1
+
+    # A cache miss would now fail
+    monkeypatch.setattr(core.checker, "check_step", None)
+    second = check_name_assign("{your_name} = 'Alex'")
+    assert second["passed"]
+    assert second["messages"] == first["messages"]
+
+
+def test_shell_entries_not_cached():
+    step_results_cache.clear()
+    assert check_name_assign("{your_name} = 'Alex'", source="shell")["passed"]
+    assert check_name_assign("{your_name} = 'Alex'", source="shell")["passed"]
+    assert not step_results_cache
+
+
+def test_entries_reading_stdin_not_cached():
+    step_results_cache.clear()
+
+    empty = check_name_assign("{your_name} = input()", stdin_input=[""])
+    assert not empty["passed"]
+    assert len(empty["messages"]) == 1
+
+    named = check_name_assign("{your_name} = input()", stdin_input=["Alex"])
+    assert named["passed"]
+    assert named["messages"] == []
+
+    assert not step_results_cache